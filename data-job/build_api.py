@@ -1,41 +1,86 @@
 #!/usr/bin/env python3
-import json, time
+import os, time, hashlib, argparse
+import concurrent.futures as futures
 from pathlib import Path
 from collections import defaultdict
 
+import jsonio
+import store
+
 ROOT = Path(__file__).resolve().parents[1]
 WEB = ROOT / "web"
 API = WEB / "api"
+VOTES_PER_PAGE = 500
+# Input fingerprints + output dependencies from the last build
+GRAPH = store.CACHE_DIR / "build-api-graph.json"
+# Output files are written by a thread pool (the work is mostly file I/O)
+WORKERS = int(os.environ.get("CRETO_BUILD_WORKERS", "8"))
 
 def load_json(p: Path, default):
     if not p.exists():
         return default
-    with p.open("r", encoding="utf-8") as f:
-        return json.load(f)
+    return jsonio.loads(p.read_bytes())
 
 def write_json(p: Path, data):
-    p.parent.mkdir(parents=True, exist_ok=True)
-    tmp = p.with_suffix(p.suffix + ".tmp")
-    tmp.write_text(json.dumps(data, indent=2), encoding="utf-8")
-    tmp.replace(p)
+    """Write `data` to `p` unless the file already holds the same bytes; returns True if written."""
+    return jsonio.write_if_changed(p, jsonio.dumps(data))
+
+def fingerprint(data):
+    return hashlib.sha1(jsonio.dumps(data, sort_keys=True)).hexdigest()
 
-def build():
-    members = load_json(WEB / "members-current.json", [])
+def vote_pages(bid, rows):
+    """Yield (path, page) for a member's voting record."""
+    # /api/member/{bid}/votes.json is page 1; further pages are votes-{n}.json
+    pages = max(1, -(-len(rows) // VOTES_PER_PAGE))
+    for n in range(1, pages + 1):
+        name = "votes.json" if n == 1 else f"votes-{n}.json"
+        yield API / "member" / bid / name, {
+            "bioguide": bid,
+            "total": len(rows),
+            "page": n,
+            "pages": pages,
+            "per_page": VOTES_PER_PAGE,
+            "votes": rows[(n - 1) * VOTES_PER_PAGE : n * VOTES_PER_PAGE],
+        }
+
+def build(full=False, workers=WORKERS):
+    # members and votes come from the store; promises are hand-edited JSON
+    db = store.connect()
+    members = store.load_members(db) or load_json(WEB / "members-current.json", [])
+    votes = store.member_votes(db)
+    db.close()
     promises = load_json(WEB / "promises.json", {})
 
     # normalize promise keys by bioguide
     prom = { (k or "").strip(): v for k, v in promises.items() }
 
-    # --- /api/states/XX.json ---
+    # --- input records, fingerprinted one by one: member:{bid}, promises:{bid}, votes:{bid}
+    records = {}
+    for i, m in enumerate(members):
+        records[f"member:{(m.get('bioguide') or '').strip() or f'#{i}'}"] = fingerprint(m)
+    for bid, p in prom.items():
+        records[f"promises:{bid}"] = fingerprint(p)
+    for bid, rows in votes.items():
+        records[f"votes:{bid}"] = fingerprint(rows)
+
+    # --- dependency graph: output path -> (input record keys, builder)
+    outputs = {}
+    def output(p, deps, make):
+        outputs[p] = (sorted(set(deps)), make)
+
+    # /api/states/XX.json
     states = defaultdict(lambda: {"sen": [], "rep": []})
-    for m in members:
+    state_deps = defaultdict(list)
+    for i, m in enumerate(members):
         st = (m.get("state") or "").strip()
         ch = m.get("chamber")
         if not st or ch not in ("sen","rep"):
             continue
+        bid = (m.get("bioguide") or "").strip()
         mm = dict(m)
         mm["promises_count"] = len(prom.get(m.get("bioguide",""), []))
         states[st][ch].append(mm)
+        state_deps[st] += [f"member:{bid or f'#{i}'}", f"promises:{bid}"]
 
     # sort entries for stable output
     for st in states:
@@ -44,38 +89,108 @@ def build():
                 key=lambda x: (x["chamber"], x.get("district") or 0, (x.get("last") or "").lower())
             )
 
-    # write per-state files + index
-    index = []
+    # per-state files + index
     for st, groups in states.items():
-        write_json(API / "states" / f"{st}.json", groups)
-        index.append({
+        output(API / "states" / f"{st}.json", state_deps[st], lambda groups=groups: groups)
+    def make_index():
+        index = [{
             "state": st,
             "senators": len(groups["sen"]),
             "representatives": len(groups["rep"])
-        })
-    index.sort(key=lambda i: i["state"])
-    write_json(API / "states" / "index.json", index)
+        } for st, groups in states.items()]
+        index.sort(key=lambda i: i["state"])
+        return index
+    output(API / "states" / "index.json",
+           [d for deps in state_deps.values() for d in deps if d.startswith("member:")], make_index)
 
-    # --- per-member detail + promises
+    # per-member detail + promises
     for m in members:
         bid = (m.get("bioguide") or "").strip()
         if not bid:
             continue
-        detail = dict(m)
-        detail["promises"] = prom.get(bid, [])
-        write_json(API / "member" / f"{bid}.json", detail)
-        write_json(API / "promises" / f"{bid}.json", prom.get(bid, []))
+        def make_detail(m=m, bid=bid):
+            detail = dict(m)
+            detail["promises"] = prom.get(bid, [])
+            detail["votes_total"] = len(votes.get(bid, []))
+            return detail
+        output(API / "member" / f"{bid}.json",
+               [f"member:{bid}", f"promises:{bid}", f"votes:{bid}"], make_detail)
+        output(API / "promises" / f"{bid}.json", [f"promises:{bid}"],
+               lambda bid=bid: prom.get(bid, []))
 
-    # --- summary
-    summary = {
+    # per-member voting records (includes former members found in vote files)
+    for bid, rows in votes.items():
+        for p, page in vote_pages(bid, rows):
+            output(p, [f"votes:{bid}"], lambda page=page: page)
+
+    # summary (generated_at only moves when its counts change)
+    summary_path = API / "members" / "summary.json"
+    def make_summary():
+        summary = {
+            "generated_at": int(time.time()),
+            "total": len(members),
+            "states": len(states),
+            "with_promises": sum(1 for m in members if len(prom.get(m.get("bioguide",""), [])) > 0)
+        }
+        prev = load_json(summary_path, {})
+        if {**prev, "generated_at": 0} == {**summary, "generated_at": 0}:
+            summary["generated_at"] = prev["generated_at"]
+        return summary
+    output(summary_path, [k for k in records if not k.startswith("votes:")], make_summary)
+
+    # --- rebuild only outputs whose inputs (or dependency set) changed since the last build
+    # --full ignores the stored fingerprints but keeps the old outputs, so orphans are still removed
+    prev = load_json(GRAPH, {})
+    prev_records = {} if full else prev.get("records", {})
+    prev_outputs = prev.get("outputs", {})
+    dirty = {k for k in records.keys() | prev_records.keys() if records.get(k) != prev_records.get(k)}
+    graph, todo = {}, []
+    for p, (deps, make) in outputs.items():
+        rel = p.relative_to(WEB).as_posix()
+        graph[rel] = deps
+        if prev_outputs.get(rel) != deps or not dirty.isdisjoint(deps) or not p.exists():
+            todo.append((p, make))
+
+    # per-state/per-member files in parallel; the index files last, once the rest is on disk
+    indexes = {API / "states" / "index.json", summary_path}
+    todo = [job for job in todo if job[0] not in indexes] + [job for job in todo if job[0] in indexes]
+    split = len(todo) - sum(1 for p, _ in todo if p in indexes)
+    def emit(job):
+        p, make = job
+        return write_json(p, make())
+    with futures.ThreadPoolExecutor(max_workers=workers) as ex:
+        written = list(ex.map(emit, todo[:split]))
+    written += [emit(job) for job in todo[split:]]
+    changed = [p.relative_to(WEB).as_posix() for (p, _), w in zip(todo, written) if w]
+    unchanged = len(outputs) - len(changed)
+
+    # outputs from the last build that no longer exist (e.g. a member left office)
+    removed = sorted(prev_outputs.keys() - graph.keys())
+    for rel in removed:
+        (WEB / rel).unlink(missing_ok=True)
+
+    write_json(GRAPH, {"records": records, "outputs": graph})
+
+    # --- manifest of what this build changed
+    write_json(API / "manifest.json", {
         "generated_at": int(time.time()),
-        "total": len(members),
-        "states": len(states),
-        "with_promises": sum(1 for m in members if len(prom.get(m.get("bioguide",""), [])) > 0)
-    }
-    write_json(API / "members" / "summary.json", summary)
+        "changed": sorted(changed),
+        "removed": removed,
+        "unchanged": unchanged,
+    })
+
+    print(f"Built static API: {len(states)} states, {len(members)} members, "
+          f"{len(votes)} voting records; {len(changed)} files changed, "
+          f"{len(removed)} removed, {unchanged} unchanged")
 
-    print(f"Built static API: {len(states)} states, {len(members)} members")
+def main():
+    ap = argparse.ArgumentParser(description="Build the static JSON API under web/api.")
+    ap.add_argument("--full", action="store_true",
+                    help="ignore the dependency graph from the last build and rebuild every output")
+    ap.add_argument("--workers", type=int, default=WORKERS,
+                    help=f"threads writing output files (default: $CRETO_BUILD_WORKERS or {WORKERS})")
+    args = ap.parse_args()
+    build(full=args.full, workers=args.workers)
 
 if __name__ == "__main__":
-    build()
+    main()
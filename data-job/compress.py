@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# data-job/compress.py
+"""
+Write precompressed .gz / .br siblings for every generated JSON file under web/
+and a manifest (web/compressed.json) that a frontend or local server can use
+to pick an encoding. Brotli output is skipped if the `brotli` module is missing.
+"""
+import argparse
+import gzip
+import os
+import time
+import concurrent.futures as futures
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+import jsonio
+
+ROOT = Path(__file__).resolve().parents[1]
+WEB = ROOT / "web"
+MANIFEST = WEB / "compressed.json"
+
+# Files below this size gain little and cost a request-time lookup.
+MIN_SIZE = int(os.environ.get("CRETO_COMPRESS_MIN_SIZE", "1024"))
+
+
+def generated_json():
+    """Every JSON file a job produces (hand-edited web/promises.json is left alone)."""
+    yield WEB / "members-current.json"
+    for sub in ("data", "api"):
+        yield from sorted((WEB / sub).rglob("*.json"))
+
+
+def encoders():
+    enc = {".gz": lambda b: gzip.compress(b, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        enc[".br"] = lambda b: brotli.compress(b, quality=11)
+    return enc
+
+
+def compress_one(src: Path, enc, force=False):
+    """Refresh the sidecars of `src`; returns {suffix: size} or None if below the threshold."""
+    sidecars = {sfx: src.with_name(src.name + sfx) for sfx in enc}
+    st = src.stat()
+    if st.st_size < MIN_SIZE:
+        for p in sidecars.values():
+            p.unlink(missing_ok=True)
+        return None
+    body = None
+    sizes = {}
+    for sfx, p in sidecars.items():
+        if force or not p.exists() or p.stat().st_mtime < st.st_mtime:
+            body = body if body is not None else src.read_bytes()
+            tmp = p.with_name(p.name + ".tmp")
+            tmp.write_bytes(enc[sfx](body))
+            tmp.replace(p)
+        sizes[sfx[1:]] = p.stat().st_size
+    return {"size": st.st_size, **sizes}
+
+
+def prune_orphans():
+    # sidecars whose JSON source no longer exists
+    for sub in ("data", "api"):
+        for p in (WEB / sub).rglob("*.json.*"):
+            if p.suffix in (".gz", ".br") and not p.with_suffix("").exists():
+                p.unlink()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Precompress generated JSON under web/.")
+    ap.add_argument("--force", action="store_true", help="recompress even if sidecars are current")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 4,
+                    help="parallel compression threads (zlib and brotli release the GIL)")
+    args = ap.parse_args()
+
+    enc = encoders()
+    files = [p for p in generated_json() if p.exists()]
+    with futures.ThreadPoolExecutor(max_workers=args.workers) as ex:
+        results = list(ex.map(lambda p: compress_one(p, enc, args.force), files))
+    prune_orphans()
+
+    manifest = {
+        "generated_at": int(time.time()),
+        "encodings": [sfx[1:] for sfx in enc],
+        "min_size": MIN_SIZE,
+        "files": {
+            "/" + p.relative_to(WEB).as_posix(): r
+            for p, r in zip(files, results) if r
+        },
+    }
+    MANIFEST.write_bytes(jsonio.dumps(manifest))
+    raw = sum(r["size"] for r in manifest["files"].values())
+    gz = sum(r["gz"] for r in manifest["files"].values())
+    print(f"Compressed {len(manifest['files'])} of {len(files)} JSON files: "
+          f"{raw} -> {gz} bytes gzip")
+
+
+if __name__ == "__main__":
+    main()
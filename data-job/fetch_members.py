@@ -1,11 +1,15 @@
 # data-job/fetch_members.py
 
-import json
 import os
+import argparse
+import hashlib
+import http.client
+import pickle
+import shutil
 import subprocess
-import tempfile
+import threading
 import time
-import urllib.request
+import concurrent.futures as futures
 import urllib.parse
 import urllib.error
 from pathlib import Path
@@ -15,25 +19,138 @@ try:
 except ImportError:
     raise SystemExit("Please `pip install pyyaml` first.")
 
+import jsonio
+import ratelimit
+import store
+
 CONGRESS_REPO = "https://github.com/unitedstates/congress-legislators.git"
+# Only these files are checked out of the upstream repo.
+REPO_FILES = ["legislators-current.yaml", "legislators-social-media.yaml"]
+HISTORICAL_FILE = "legislators-historical.yaml"  # ~12k former legislators, opt-in
+
+ROOT = Path(__file__).resolve().parents[1]
+# Persistent sparse mirror + the commit last turned into members-current.json
+MIRROR = store.CACHE_DIR / "congress-legislators"
+MIRROR_STATE = store.CACHE_DIR / "members-state.json"
+# Parsed YAML, pickled and keyed by the source file's hash
+YAML_CACHE = store.CACHE_DIR / "yaml"
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)  # libyaml when available
 
 # The base for the Congress.gov API. Your key from api.data.gov must be passed
 # as a *query parameter* (api_key=...) – NOT as an X-API-Key header.
 API_BASE = "https://api.congress.gov/v3"
 API_KEY = os.environ.get("CONGRESS_GOV_API_KEY")
+# api.data.gov allows 5,000 requests/hour per key; these bound our share of it.
+API_WORKERS = int(os.environ.get("CRETO_CONGRESS_WORKERS", "4"))
+API_RPS = float(os.environ.get("CRETO_CONGRESS_RPS", "4"))
+# On-disk response cache: fresh for the endpoint's TTL, then served stale while
+# a background refresh runs for up to API_STALE more seconds.
+API_CACHE = store.CACHE_DIR / "congressgov"
+API_TTLS = {"/member": 6 * 3600}  # by first path segment; seated membership moves slowly
+API_DEFAULT_TTL = int(os.environ.get("CRETO_CONGRESS_TTL", "3600"))
+API_STALE = int(os.environ.get("CRETO_CONGRESS_STALE", str(24 * 3600)))
+
+
+API_LIMITER = ratelimit.for_host(urllib.parse.urlsplit(API_BASE).hostname, rate=API_RPS,
+                                  max_concurrency=API_WORKERS, window=3600)
+
+# One keep-alive connection per (thread, host); http.client connections are not thread-safe.
+_conns = threading.local()
+
+
+REDIRECTS = (301, 302, 303, 307, 308)
+MAX_REDIRECTS = 5  # urllib's redirect handler allows 10; the API itself does not chain them
+
+
+def _pooled_get(url: str, headers, timeout, redirects=MAX_REDIRECTS):
+    """
+    GET `url` over this thread's persistent connection to its host and return (body, headers).
+    Follows redirects and raises urllib.error.HTTPError / URLError like urlopen does.
+    """
+    parts = urllib.parse.urlsplit(url)
+    target = parts.path + (f"?{parts.query}" if parts.query else "")
+    pool = _conns.__dict__.setdefault("pool", {})
+    key = (parts.scheme, parts.netloc)
+    for fresh in (False, True):
+        conn = None if fresh else pool.get(key)
+        reused = conn is not None
+        if conn is None:
+            cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+            conn = pool[key] = cls(parts.netloc, timeout=timeout)
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)  # an open socket keeps the timeout it was created with
+        try:
+            conn.request("GET", target, headers=headers)
+            resp = conn.getresponse()
+            body = resp.read()  # drain fully so the connection can be reused
+        except (http.client.HTTPException, OSError) as e:
+            conn.close()
+            pool.pop(key, None)
+            # The server may have dropped an idle keep-alive connection; retry once on a new one
+            if reused and isinstance(e, (http.client.RemoteDisconnected, ConnectionError)):
+                continue
+            raise urllib.error.URLError(e) from e
+        if resp.will_close:
+            conn.close()
+            pool.pop(key, None)
+        if resp.status in REDIRECTS and resp.headers.get("Location"):
+            if redirects <= 0:
+                raise urllib.error.HTTPError(url, resp.status, "too many redirects", resp.headers, None)
+            return _pooled_get(urllib.parse.urljoin(url, resp.headers["Location"]), headers, timeout,
+                               redirects - 1)
+        if resp.status >= 300:
+            raise urllib.error.HTTPError(url, resp.status, resp.reason, resp.headers, None)
+        return body, resp.headers
 
 
 # ---------- HTTP helper ----------
-def http_json(path: str, params=None, headers=None, timeout=30, max_retries=3):
+def http_json(path: str, params=None, headers=None, timeout=30, max_retries=3, ttl=None):
     """
     GET JSON from Congress.gov via api.data.gov.
     - Adds `api_key` query param (required by api.data.gov gateway)
     - URL-encodes parameters
     - Sets a User-Agent
-    - Retries on transient HTTP errors
+    - Reuses keep-alive connections across calls (one per thread and host)
+    - Retries on transient HTTP errors, waiting out Retry-After when given
+    - Every attempt goes through API_LIMITER, the host's shared adaptive limiter
+    - Answers from API_CACHE when fresh (`ttl` seconds, default per endpoint;
+      0 bypasses the cache), serves stale entries while refreshing them in the
+      background, and falls back to a stale entry if the live request fails
     """
     params = dict(params or {})
     params.setdefault("format", "json")
+    if ttl is None:
+        ttl = API_TTLS.get("/" + path.strip("/").split("/")[0], API_DEFAULT_TTL)
+    if not ttl:
+        return _fetch_json(path, params, headers, timeout, max_retries)
+
+    cached = _cache_path(path, params)
+    entry = _cache_read(cached)
+    age = time.time() - entry["fetched"] if entry else None
+    if entry and age < ttl:
+        return entry["data"]
+    if entry and age < ttl + API_STALE:
+        _revalidate(cached, path, params, headers, timeout, max_retries)
+        return entry["data"]
+    try:
+        data = _fetch_json(path, params, headers, timeout, max_retries)
+    except urllib.error.HTTPError as e:
+        if e.code in (401, 403) or not entry:
+            raise
+        print(f"WARN: {path} failed ({e}); using cached copy from {int(age)}s ago.")
+        return entry["data"]
+    except urllib.error.URLError as e:
+        if not entry:
+            raise
+        print(f"WARN: {path} failed ({e}); using cached copy from {int(age)}s ago.")
+        return entry["data"]
+    _cache_write(cached, data)
+    return data
+
+
+def _fetch_json(path: str, params, headers, timeout, max_retries):
+    params = dict(params)
     if API_KEY:
         params["api_key"] = API_KEY  # <-- REQUIRED for api.data.gov proxy
 
@@ -45,41 +162,145 @@ def http_json(path: str, params=None, headers=None, timeout=30, max_retries=3):
         hdrs.update(headers)
 
     for attempt in range(1, max_retries + 1):
+        API_LIMITER.acquire()
         try:
-            req = urllib.request.Request(full_url, headers=hdrs)
-            with urllib.request.urlopen(req, timeout=timeout) as r:
-                return json.load(r)
+            body, resp_headers = _pooled_get(full_url, hdrs, timeout)
         except urllib.error.HTTPError as e:
+            API_LIMITER.release(e.code, e.headers)
             # Don't retry auth errors
             if e.code in (401, 403):
                 raise
             # Retry rate limits / server errors
-            if e.code in (429, 500, 502, 503, 504) and attempt < max_retries:
-                time.sleep(1.0 * attempt)
+            if e.code in ratelimit.RETRY_STATUSES and attempt < max_retries:
+                time.sleep(ratelimit.retry_delay(attempt, e.headers))
                 continue
             raise
         except urllib.error.URLError:
+            API_LIMITER.release()
             if attempt < max_retries:
-                time.sleep(1.0 * attempt)
+                time.sleep(ratelimit.retry_delay(attempt))
                 continue
             raise
+        API_LIMITER.release(200, resp_headers)
+        return jsonio.loads(body)
+
+
+# ---------- Response cache ----------
+_refreshing = set()
+_refresh_lock = threading.Lock()
+_refresher = futures.ThreadPoolExecutor(max_workers=2)  # joined at interpreter exit
+
+
+def _cache_path(path: str, params) -> Path:
+    # api_key is never part of the key (or written to disk)
+    key = urllib.parse.urlencode(sorted((k, str(v)) for k, v in params.items() if k != "api_key"))
+    digest = hashlib.sha256(f"{path}?{key}".encode("utf-8")).hexdigest()
+    return API_CACHE / digest[:2] / f"{digest}.json"
+
+
+def _cache_read(cached: Path):
+    try:
+        return jsonio.loads(cached.read_bytes())
+    except (OSError, ValueError):
+        return None
+
+
+def _cache_write(cached: Path, data):
+    cached.parent.mkdir(parents=True, exist_ok=True)
+    tmp = cached.with_name(f"{cached.name}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(jsonio.dumps({"fetched": time.time(), "data": data}))
+    tmp.replace(cached)
+
+
+def _revalidate(cached: Path, path: str, params, headers, timeout, max_retries):
+    """Refresh one stale entry in the background (at most once at a time per entry)."""
+    with _refresh_lock:
+        if cached in _refreshing:
+            return
+        _refreshing.add(cached)
+
+    def refresh():
+        try:
+            _cache_write(cached, _fetch_json(path, params, headers, timeout, max_retries))
+        except Exception as e:
+            print(f"WARN: background refresh of {path} failed ({e}).")
+        finally:
+            with _refresh_lock:
+                _refreshing.discard(cached)
+
+    _refresher.submit(refresh)
+
+
+# ---------- Upstream mirror ----------
+def sync_mirror(files=REPO_FILES):
+    """
+    Update the local sparse, blobless mirror of congress-legislators and return its commit.
+    - First run: shallow clone without blobs, then check out only `files`
+    - Later runs: shallow fetch of upstream HEAD and move the checkout to it
+    """
+    patterns = [f"/{f}" for f in files]  # anchored: top-level files only
+    if not (MIRROR / ".git").exists():
+        shutil.rmtree(MIRROR, ignore_errors=True)
+        MIRROR.parent.mkdir(parents=True, exist_ok=True)
+        subprocess.check_call(["git", "clone", "--depth", "1", "--filter=blob:none",
+                               "--no-checkout", CONGRESS_REPO, str(MIRROR)])
+        subprocess.check_call(["git", "sparse-checkout", "set", "--no-cone", *patterns], cwd=MIRROR)
+        subprocess.check_call(["git", "checkout"], cwd=MIRROR)
+    else:
+        subprocess.check_call(["git", "sparse-checkout", "set", "--no-cone", *patterns], cwd=MIRROR)
+        subprocess.check_call(["git", "fetch", "--depth", "1", "origin", "HEAD"], cwd=MIRROR)
+        subprocess.check_call(["git", "reset", "--hard", "FETCH_HEAD"], cwd=MIRROR)
+    return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=MIRROR, text=True).strip()
 
 
 # ---------- YAML -> list ----------
-def load_from_repo(repo_dir: Path):
-    """Load bios + terms + ids from YAML."""
-    cur = yaml.safe_load(open(repo_dir / "legislators-current.yaml", "rb"))
-    social_map = {}
+def load_yaml(path: Path):
+    """safe_load `path`, reusing the pickled result of a previous parse of identical bytes."""
+    raw = path.read_bytes()
+    digest = hashlib.sha256(raw).hexdigest()[:16]
+    cached = YAML_CACHE / f"{path.stem}-{digest}.pickle"
+    if cached.exists():
+        try:
+            return pickle.loads(cached.read_bytes())
+        except Exception:
+            pass  # unreadable sidecar: parse again below
+    data = yaml.load(raw, Loader=YAML_LOADER)
+    YAML_CACHE.mkdir(parents=True, exist_ok=True)
+    for old in YAML_CACHE.glob(f"{path.stem}-*.pickle"):
+        old.unlink()
+    tmp = cached.with_suffix(".tmp")
+    tmp.write_bytes(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL))
+    tmp.replace(cached)
+    return data
+
+
+def read_legislators(repo_dir: Path):
+    return load_yaml(repo_dir / "legislators-current.yaml")
+
+
+def read_historical(repo_dir: Path):
+    return load_yaml(repo_dir / HISTORICAL_FILE)
+
+
+def read_social(repo_dir: Path):
     try:
-        social_map = {
+        return {
             i["id"]["bioguide"]: i.get("social", {})
-            for i in yaml.safe_load(open(repo_dir / "legislators-social-media.yaml", "rb"))
+            for i in load_yaml(repo_dir / "legislators-social-media.yaml")
         }
     except FileNotFoundError:
-        pass
+        return {}
+
+
+def load_from_repo(repo_dir: Path):
+    """Load bios + terms + ids from YAML."""
+    return members_from(read_legislators(repo_dir), read_social(repo_dir))
 
+
+def members_from(legislators, social_map):
+    """One record per legislator, described by their latest term."""
     out = []
-    for leg in cur:
+    for leg in legislators:
         ids = leg.get("id", {})
         name = leg.get("name", {})
         terms = leg.get("terms", [])
@@ -91,6 +312,7 @@ def load_from_repo(repo_dir: Path):
             {
                 "bioguide": bioguide,
                 "govtrack": ids.get("govtrack"),
+                "lis": ids.get("lis"),
                 "fec": ids.get("fec", []),
                 "first": name.get("first"),
                 "last": name.get("last"),
@@ -112,36 +334,107 @@ def load_from_repo(repo_dir: Path):
     return out
 
 
+def term_rows(legislators):
+    """Every term of every legislator, as rows for the store's terms table."""
+    rows = []
+    for leg in legislators:
+        bioguide = leg.get("id", {}).get("bioguide")
+        for t in leg.get("terms", []):
+            rows.append({
+                "bioguide": bioguide,
+                "type": t.get("type"),
+                "state": t.get("state"),
+                "district": t.get("district"),
+                "class": t.get("class"),
+                "party": t.get("party"),
+                "start": str(t.get("start") or ""),
+                "end": str(t.get("end") or ""),
+            })
+    return rows
+
+
 # ---------- Optional live filter via Congress.gov ----------
-def current_bioguide_ids_from_congressgov():
-    """Confirm who's currently seated via Congress.gov (needs API key)."""
+def current_bioguide_ids_from_congressgov(workers=API_WORKERS):
+    """
+    Confirm who's currently seated via Congress.gov (needs API key).
+    - The first page's pagination.count gives the total
+    - The remaining offsets are fetched concurrently (paced by API_LIMITER)
+    """
     ids = set()
-    offset, page_size = 0, 250
-    while True:
-        data = http_json("/member", {"limit": page_size, "offset": offset})
-        members = data.get("members", [])
-        if not members:
-            break
-        for m in members:
+    page_size = 250
+
+    def add(data):
+        for m in data.get("members", []):
             bid = (m.get("bioguideId") or "").strip()
             if bid:
                 ids.add(bid)
-        offset += page_size
-        time.sleep(0.15)  # be polite
+
+    first = http_json("/member", {"limit": page_size, "offset": 0})
+    add(first)
+    total = (first.get("pagination") or {}).get("count")
+    if total is None:
+        # No count to fan out from; walk the pages until one comes back empty
+        offset = page_size
+        while True:
+            data = http_json("/member", {"limit": page_size, "offset": offset})
+            if not data.get("members"):
+                break
+            add(data)
+            offset += page_size
+        return ids
+
+    offsets = range(page_size, int(total), page_size)
+    with futures.ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+        pending = [ex.submit(http_json, "/member", {"limit": page_size, "offset": o}) for o in offsets]
+        for fut in futures.as_completed(pending):
+            add(fut.result())
     return ids
 
 
 def main():
-    root = Path(__file__).resolve().parents[1]
-    web = root / "web"
+    ap = argparse.ArgumentParser(description="Refresh web/members-current.json from congress-legislators.")
+    ap.add_argument("--force", action="store_true",
+                    help="rebuild even if the upstream commit has not changed since the last run")
+    ap.add_argument("--historical", action="store_true",
+                    help=f"also load {HISTORICAL_FILE} into the store (terms, LIS ids) "
+                         "to attribute historical votes; remembered for later runs")
+    args = ap.parse_args()
+    prev = jsonio.loads(MIRROR_STATE.read_bytes()) if MIRROR_STATE.exists() else {}
+    # --historical sticks: later runs (the workflow never passes it) keep loading
+    # the former legislators instead of dropping their terms and LIS ids
+    historical = args.historical or HISTORICAL_FILE in prev.get("files", [])
+    files = REPO_FILES + ([HISTORICAL_FILE] if historical else [])
+
+    web = ROOT / "web"
     web.mkdir(parents=True, exist_ok=True)
     out_path = web / "members-current.json"
 
-    # Pull upstream data
-    with tempfile.TemporaryDirectory() as td:
-        td = Path(td)
-        subprocess.check_call(["git", "clone", "--depth", "1", CONGRESS_REPO, str(td)])
-        members = load_from_repo(td)
+    # Pull upstream data; nothing to do if it hasn't moved since the store was
+    # last loaded (members-current.json is still re-exported from the store,
+    # in case it is missing; unchanged bytes are left alone)
+    commit = sync_mirror(files)
+    state = {"commit": commit, "files": files}
+    if not args.force and prev == state:
+        db = store.connect()
+        members = store.load_members(db)
+        db.close()
+        if members:
+            jsonio.write_if_changed(out_path, jsonio.dumps(members))
+            print(f"congress-legislators unchanged at {commit[:12]}; kept {len(members)} members.")
+            return
+    legislators = read_legislators(MIRROR)
+    historical = read_historical(MIRROR) if historical else []
+    social = read_social(MIRROR)
+    members = members_from(legislators, social)
+    former = members_from(historical, social)
+    terms = term_rows(legislators + historical)
+
+    # The LIS join now happens in the store (store.lis_index); drop the old
+    # export that may still sit in the cached web/data.
+    (web / "data" / "lis-bioguide.json").unlink(missing_ok=True)
+
+    members.sort(key=lambda m: (m["chamber"], m["state"], m.get("district") or 0, m["last"] or ""))
+    legislators = members + former
 
     # Optionally filter by who is currently in office via Congress.gov
     if API_KEY:
@@ -152,9 +445,17 @@ def main():
             # Fail soft so the site still deploys
             print(f"WARN: Congress.gov check failed ({e}); keeping all current.yaml members.")
 
-    members.sort(key=lambda m: (m["chamber"], m["state"], m.get("district") or 0, m["last"] or ""))
+    # The store keeps every loaded legislator (for LIS lookups) and flags the current ones
+    db = store.connect()
+    store.save_members(db, legislators, {m.get("bioguide") for m in members}, terms)
+    # Votes stored before these LIS ids or terms were known may now resolve
+    resolved = store.resolve_senators(db, store.TermIndex(store.load_terms(db)))
+    if resolved:
+        print(f"Attributed previously unresolved senators in {resolved} stored votes.")
+    db.close()
 
-    out_path.write_text(json.dumps(members, indent=2))
+    jsonio.write_if_changed(out_path, jsonio.dumps(members))
+    MIRROR_STATE.write_bytes(jsonio.dumps(state))
     print(f"Wrote {out_path} with {len(members)} records.")
 
 
@@ -1,54 +1,224 @@
 # data-job/fetch_votes.py
 import os
-import json
+import io
+import argparse
+import hashlib
 import time
-import math
-import concurrent.futures as futures
+import asyncio
+from array import array
 from pathlib import Path
 from datetime import datetime
+from urllib.parse import urlsplit
 from dateutil import tz
-import requests
+import aiohttp
 import xml.etree.ElementTree as ET
 
+import jsonio
+import ratelimit
+import store
+
 ROOT = Path(__file__).resolve().parents[1]
 WEB_DATA = ROOT / "web" / "data"
 WEB_DATA.mkdir(parents=True, exist_ok=True)
+SYNC_STATE = store.CACHE_DIR / "votes-sync.json"
+CHECKPOINT = store.CACHE_DIR / "backfill-checkpoint.json"
+HTTP_CACHE = store.CACHE_DIR / "http"
+
+# How votes are exported from the store into web/data: "files" (one
+# vote-*.json per roll call, the default), "pack" (one range-readable archive
+# per session) or "both".
+VOTE_LAYOUT = os.environ.get("CRETO_VOTE_LAYOUT", "files")
+
+HEADERS = {"User-Agent": "CretoVotes/1.0 (+github.com/yourhandle)"}
 
-SESS = requests.Session()
-SESS.headers.update({"User-Agent": "CretoVotes/1.0 (+github.com/yourhandle)"})
+# Fetch engine limits: requests in flight overall, and the politeness budget
+# per host as requests/second (bursts up to the same number). Each host's
+# concurrency adapts within CONCURRENCY to how it answers (see ratelimit.py).
+CONCURRENCY = int(os.environ.get("CRETO_CONCURRENCY", "64"))
+HOST_RATES = {
+    "www.senate.gov": float(os.environ.get("CRETO_SENATE_RPS", "20")),
+    "clerk.house.gov": float(os.environ.get("CRETO_HOUSE_RPS", "20")),
+}
+RETRIES = int(os.environ.get("CRETO_FETCH_RETRIES", "4"))  # attempts per request
+# Validator-cache entries not confirmed by the server for this long are pruned.
+HTTP_CACHE_MAX_AGE = int(os.environ.get("CRETO_HTTP_CACHE_DAYS", "30")) * 86400
 
 # ---------------------------
 # Utilities
 # ---------------------------
 def save_json(path: Path, data):
-    path.parent.mkdir(parents=True, exist_ok=True)
-    tmp = path.with_suffix(path.suffix + ".tmp")
-    with tmp.open("w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, separators=(",", ":" ))
-    tmp.replace(path)
+    # unchanged exports keep their mtime, so compress (and the pipeline) can skip them
+    return jsonio.write_if_changed(path, jsonio.dumps(data))
+
+def load_json(path: Path, default):
+    if not path.exists():
+        return default
+    try:
+        return jsonio.loads(path.read_bytes())
+    except ValueError:
+        return default
+
+def cache_paths(url: str):
+    name = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    return HTTP_CACHE / f"{name}.body", HTTP_CACHE / f"{name}.json"
+
+def cache_validators(url: str):
+    """Conditional request headers for `url` from the on-disk validator cache."""
+    body_path, meta_path = cache_paths(url)
+    meta = load_json(meta_path, {}) if body_path.exists() else {}
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+    return headers
+
+def cache_store(url: str, headers, body: bytes):
+    etag, modified = headers.get("ETag"), headers.get("Last-Modified")
+    if not (etag or modified):
+        return
+    body_path, meta_path = cache_paths(url)
+    body_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = body_path.with_suffix(".tmp")
+    tmp.write_bytes(body)
+    tmp.replace(body_path)
+    save_json(meta_path, {"url": url, "etag": etag, "last_modified": modified})
+
+def prune_http_cache(max_age=HTTP_CACHE_MAX_AGE):
+    # Bodies are touched on every 304, so anything older is no longer requested
+    # (e.g. the menu of a finished session, or roll XML cached by older versions).
+    if not HTTP_CACHE.exists():
+        return
+    cutoff = time.time() - max_age
+    for body_path in HTTP_CACHE.glob("*.body"):
+        if body_path.stat().st_mtime < cutoff:
+            body_path.unlink(missing_ok=True)
+            body_path.with_suffix(".json").unlink(missing_ok=True)
 
 def get_text(el, tag, default=""):
     x = el.find(tag)
     return x.text.strip() if x is not None and x.text else default
 
+def iter_xml(content: bytes):
+    """
+    Stream an XML document, yielding (parent_tag, element) as each element closes.
+    Callers may clear() an element once consumed to keep memory flat.
+    """
+    stack = []
+    for ev, el in ET.iterparse(io.BytesIO(content), events=("start", "end")):
+        if ev == "start":
+            stack.append(el.tag)
+        else:
+            stack.pop()
+            yield (stack[-1] if stack else None), el
+
+def to_int(s):
+    try:
+        return int(s)
+    except (TypeError, ValueError):
+        return 0
+
 def parse_dt(s):
-    # Senate uses e.g. "January 09, 2025"
+    # Senate uses e.g. "January 09, 2025" (roll XML appends ", 02:13 PM")
     try:
-        return datetime.strptime(s.strip(), "%B %d, %Y").date().isoformat()
+        return datetime.strptime(",".join(s.split(",")[:2]).strip(), "%B %d, %Y").date().isoformat()
     except Exception:
         return s
 
+def house_date(s):
+    # House EVS uses e.g. "3-Jan-2025"
+    try:
+        return datetime.strptime(s.strip(), "%d-%b-%Y").date().isoformat()
+    except Exception:
+        return s
+
+def attribute(members, terms, chamber: str, date: str):
+    # Members the roll-call XML didn't identify: match them by last name against
+    # whoever held one of their state's seats on the vote date.
+    for m in members:
+        if m["bioguide_id"] or not m.get("state"):
+            continue
+        m["bioguide_id"] = terms.match(m["state"], chamber, date, m.get("last_name")) or ""
+
+# ---------------------------
+# Fetch engine (asyncio)
+# ---------------------------
+class FetchEngine:
+    """
+    One aiohttp session shared by every collector.
+    - Reuses keep-alive connections
+    - Bounds requests in flight to `concurrency`
+    - Paces each host through its shared adaptive limiter (ratelimit.for_host)
+    - Retries throttling, server errors and timeouts, honoring Retry-After
+    - Answers 304s from the on-disk validator cache, for the mutable
+      resources fetched with `revalidate` (roll-call XML never changes and
+      is never re-requested outside --full, so its bodies are not kept)
+    """
+    def __init__(self, concurrency=CONCURRENCY, rates=None, retries=RETRIES):
+        self.concurrency = concurrency
+        self.rates = HOST_RATES if rates is None else rates
+        self.retries = retries
+
+    async def __aenter__(self):
+        self.sem = asyncio.Semaphore(self.concurrency)
+        self.session = aiohttp.ClientSession(
+            headers=HEADERS,
+            connector=aiohttp.TCPConnector(limit=self.concurrency),
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    def limiter(self, url: str):
+        host = urlsplit(url).hostname
+        return ratelimit.for_host(host, rate=self.rates.get(host), max_concurrency=self.concurrency)
+
+    async def get(self, url: str, timeout=30, revalidate=False):
+        """GET `url` and return the body bytes; raises aiohttp.ClientResponseError on error status."""
+        limiter = self.limiter(url)
+        for attempt in range(1, self.retries + 1):
+            await limiter.acquire_async()
+            status = headers = None
+            try:
+                async with self.sem:
+                    body, status, headers = await self._get_once(url, timeout, revalidate)
+                return body
+            except aiohttp.ClientResponseError as e:
+                status, headers = e.status, e.headers
+                if e.status not in ratelimit.RETRY_STATUSES or attempt == self.retries:
+                    raise
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if attempt == self.retries:
+                    raise
+            finally:
+                limiter.release(status, headers)
+            await asyncio.sleep(ratelimit.retry_delay(attempt, headers))
+
+    async def _get_once(self, url: str, timeout, revalidate):
+        validators = cache_validators(url) if revalidate else {}
+        async with self.session.get(url, headers=validators,
+                                    timeout=aiohttp.ClientTimeout(total=timeout)) as r:
+            if r.status == 304 and validators:
+                body_path = cache_paths(url)[0]
+                body_path.touch()  # still current; keep it out of prune_http_cache
+                return body_path.read_bytes(), r.status, r.headers
+            r.raise_for_status()
+            body = await r.read()
+            if revalidate:
+                cache_store(url, r.headers, body)
+            return body, r.status, r.headers
+
 # ---------------------------
 # Senate (authoritative XML)
 # ---------------------------
 SENATE_MENU = "https://www.senate.gov/legislative/LIS/roll_call_lists/vote_menu_{congress}_{session}.xml"
 SENATE_VOTE_XML = "https://www.senate.gov/legislative/LIS/roll_call_votes/vote{congress}{session:01d}/vote_{congress}_{session:01d}_{roll:05d}.xml"
 
-def fetch_senate_menu(congress: int, session: int):
+async def fetch_senate_menu(engine, congress: int, session: int):
     url = SENATE_MENU.format(congress=congress, session=session)
-    r = SESS.get(url, timeout=30)
-    r.raise_for_status()
-    return ET.fromstring(r.content)
+    # the menu grows during a session; revalidate it against the cached copy
+    return ET.fromstring(await engine.get(url, timeout=30, revalidate=True))
 
 def normalize_senate_menu(root, congress, session):
     # <vote_summary> nodes
@@ -75,37 +245,47 @@ def normalize_senate_menu(root, congress, session):
     rows.sort(key=lambda x: x["rollcall"])
     return rows
 
-def fetch_senate_roll(congress: int, session: int, roll: int):
+async def fetch_senate_roll(engine, congress: int, session: int, roll: int):
     url = SENATE_VOTE_XML.format(congress=congress, session=session, roll=roll)
-    r = SESS.get(url, timeout=30)
-    r.raise_for_status()
-    return ET.fromstring(r.content)
-
-def normalize_senate_roll(root, congress, session, roll):
-    meta = root.find(".//vote_metadata")
-    question = get_text(meta, "vote_question_text")
-    title = get_text(meta, "vote_title")
-    result = get_text(meta, "vote_result_text")
-    date = parse_dt(get_text(meta, "vote_date"))
-    issue = get_text(meta, "issue")
-    tot = root.find(".//count")
+    return await engine.get(url, timeout=30)
+
+def normalize_senate_roll(content, congress, session, roll, lis_map=None, terms=None):
+    # One streaming pass: top-level metadata leaves (first occurrence wins),
+    # <count> totals, and each <member> emitted and cleared as it closes.
+    # Senate XML lacks bioguide ids; they are resolved from the LIS id via `lis_map`,
+    # then by seat and name via the TermIndex `terms`.
+    lis_map = lis_map or {}
+    meta, tot, members = {}, {}, []
+    for parent, el in iter_xml(content):
+        if el.tag == "member":
+            lis_id = get_text(el, "lis_member_id")
+            members.append({
+                "bioguide_id": lis_map.get(lis_id, ""),
+                "last_name": get_text(el, "last_name"),
+                "first_name": get_text(el, "first_name"),
+                "party": get_text(el, "party"),
+                "state": get_text(el, "state"),
+                "vote": get_text(el, "vote_cast"),
+                "lis_member_id": lis_id,
+            })
+            el.clear()
+        elif parent == "count":
+            tot[el.tag] = (el.text or "").strip()
+        elif parent in ("roll_call_vote", "vote_metadata", "document") and len(el) == 0:
+            meta.setdefault(el.tag, (el.text or "").strip())
+    question = meta.get("vote_question_text", "")
+    title = meta.get("vote_title", "")
+    result = meta.get("vote_result_text", "")
+    date = parse_dt(meta.get("vote_date", ""))
+    if terms is not None:
+        attribute(members, terms, "sen", date)
+    issue = meta.get("issue") or meta.get("document_name", "")
     totals = {
-        "yea": int(get_text(tot, "yeas", "0")),
-        "nay": int(get_text(tot, "nays", "0")),
-        "present": int(get_text(tot, "present", "0")),
-        "nv": int(get_text(tot, "not_voting", "0")),
+        "yea": to_int(tot.get("yeas")),
+        "nay": to_int(tot.get("nays")),
+        "present": to_int(tot.get("present")),
+        "nv": to_int(tot.get("not_voting") or tot.get("absent")),
     }
-    members = []
-    for m in root.findall(".//member"):
-        members.append({
-            "bioguide_id": get_text(m, "member_full").split()[-1],  # unreliable; Senate XML lacks bioguide
-            "last_name": get_text(m, "last_name"),
-            "first_name": get_text(m, "first_name"),
-            "party": get_text(m, "party"),
-            "state": get_text(m, "state"),
-            "vote": get_text(m, "vote_cast"),
-            "lis_member_id": get_text(m, "lis_member_id"),
-        })
     return {
         "key": f"{congress}-senate-{session}-{roll}",
         "congress": congress,
@@ -140,43 +320,56 @@ def year_for(congress: int, session: int):
     # 1st: 1789, 2nd: 1791, ... -> year = 1789 + (congress-1)*2 + (session-1)
     return 1789 + (congress - 1) * 2 + (session - 1)
 
-def fetch_house_roll(congress: int, session: int, roll: int):
+async def fetch_house_roll(engine, congress: int, session: int, roll: int):
     year = year_for(congress, session)
     url = HOUSE_VOTE_XML.format(year=year, roll=roll)
-    r = SESS.get(url, timeout=20)
-    if r.status_code == 404:
-        return None, url
-    r.raise_for_status()
-    return ET.fromstring(r.content), url
+    try:
+        content = await engine.get(url, timeout=20)
+    except aiohttp.ClientResponseError as e:
+        if e.status == 404:
+            return None, url
+        raise
+    return content, url
 
-def normalize_house_roll(root, congress, session, roll, vote_url):
+def normalize_house_roll(content, congress, session, roll, vote_url, terms=None):
     # House EVS XML uses different tags
-    # <rollcall-vote><vote-metadata>...</vote-metadata><recorded-vote>...</recorded-vote>...</rollcall-vote>
-    meta = root.find(".//vote-metadata")
-    question = get_text(meta, "vote-question")
-    result = get_text(meta, "vote-result")
-    date = get_text(meta, "vote-date")
-    billnum = get_text(meta, "legis-num")
-    title = get_text(meta, "vote-desc") or get_text(meta, "vote-question")
-    # Totals
+    # <rollcall-vote><vote-metadata>...<vote-totals><totals-by-vote>...</vote-totals></vote-metadata>
+    # <vote-data><recorded-vote>...</recorded-vote>...</vote-data></rollcall-vote>
+    # Streamed in one pass; each <recorded-vote> is cleared once emitted.
+    meta, tot, members = {}, {}, []
+    for parent, el in iter_xml(content):
+        if el.tag == "recorded-vote":
+            who = el.find("legislator")
+            attrs = who.attrib if who is not None else {}
+            members.append({
+                "bioguide_id": attrs.get("name-id", ""),
+                "last_name": attrs.get("unaccented-name", "").split(",")[0].strip(),
+                "first_name": attrs.get("first", ""),
+                "party": attrs.get("party", ""),
+                "state": attrs.get("state", ""),
+                "district": attrs.get("district", ""),
+                "vote": get_text(el, "vote")
+            })
+            el.clear()
+        elif parent == "totals-by-vote":
+            tot[el.tag] = (el.text or "").strip()
+        elif parent == "vote-metadata" and len(el) == 0:
+            meta.setdefault(el.tag, (el.text or "").strip())
+    question = meta.get("vote-question", "")
+    result = meta.get("vote-result", "")
+    date = meta.get("vote-date") or meta.get("action-date", "")
+    if terms is not None:
+        attribute(members, terms, "rep", house_date(date))
+    billnum = meta.get("legis-num", "")
+    title = meta.get("vote-desc") or question
+    # Totals (older files carry them directly under <vote-metadata>)
+    tot = tot or meta
     totals = {
-        "yea": int(get_text(meta, "yea-total", "0")),
-        "nay": int(get_text(meta, "nay-total", "0")),
-        "present": int(get_text(meta, "present-total", "0")),
-        "nv": int(get_text(meta, "not-voting-total", "0")),
+        "yea": to_int(tot.get("yea-total")),
+        "nay": to_int(tot.get("nay-total")),
+        "present": to_int(tot.get("present-total")),
+        "nv": to_int(tot.get("not-voting-total")),
     }
-    members = []
-    for rv in root.findall(".//recorded-vote"):
-        who = rv.find("legislator")
-        members.append({
-            "bioguide_id": who.attrib.get("name-id", ""),
-            "last_name": who.attrib.get("unaccented-name", "").split(",")[0].strip(),
-            "first_name": who.attrib.get("first", ""),
-            "party": who.attrib.get("party", ""),
-            "state": who.attrib.get("state", ""),
-            "district": who.attrib.get("district", ""),
-            "vote": get_text(rv, "vote")
-        })
     return {
         "key": f"{congress}-house-{session}-{roll}",
         "congress": congress,
@@ -193,86 +386,332 @@ def normalize_house_roll(root, congress, session, roll, vote_url):
         "source": {"vote_xml": vote_url}
     }
 
+# ---------------------------
+# Storage layout
+# ---------------------------
+def vote_path(congress: int, chamber: str, session: int, roll: int):
+    return WEB_DATA / f"vote-{congress}-{chamber}-{session}-{roll}.json"
+
+def export_files(db, congress: int, chamber: str, session: int):
+    # Per-roll files are exports of the store: (re)write any that are missing
+    # or stale (e.g. a senator resolved since), or remove them all when the
+    # session is published as a pack only.
+    for v in store.session_votes(db, congress, chamber, session):
+        p = vote_path(congress, chamber, session, v["rollcall"])
+        if VOTE_LAYOUT == "pack":
+            p.unlink(missing_ok=True)
+        else:
+            save_json(p, v)
+
+def write_pack(db, congress: int, chamber: str, session: int):
+    """
+    Bundle a session into votes-{key}.pack (compact JSON documents back to back)
+    and votes-{key}.pack-index.json mapping each roll to [offset, length], so a
+    single vote can be range-read from one file.
+    """
+    key = f"{congress}-{chamber}-{session}"
+    chunks, rolls, offset = [], {}, 0
+    for v in store.session_votes(db, congress, chamber, session):
+        body = jsonio.dumps(v)
+        rolls[str(v["rollcall"])] = [offset, len(body)]
+        chunks.append(body)
+        offset += len(body)
+    path = WEB_DATA / f"votes-{key}.pack"
+    body = b"".join(chunks)
+    jsonio.write_if_changed(path, body)
+    save_json(WEB_DATA / f"votes-{key}.pack-index.json", {
+        "congress": congress,
+        "chamber": chamber,
+        "session": session,
+        "data": path.name,
+        # earlier votes can be rewritten (e.g. a senator resolved later), shifting
+        # every offset after them; readers cache the pack by this hash
+        "sha1": hashlib.sha1(body).hexdigest(),
+        "rolls": rolls,
+    })
+
 # ---------------------------
 # Driver
 # ---------------------------
-def collect_senate(congress: int, session: int):
-    root = fetch_senate_menu(congress, session)
+async def collect_senate(engine, db, congress: int, session: int, full=False):
+    root = await fetch_senate_menu(engine, congress, session)
     rows = normalize_senate_menu(root, congress, session)
-    # Save list file
-    save_json(WEB_DATA / f"votes-{congress}-senate-{session}.json", rows)
-    # Fetch per-vote detail (parallel)
-    def work(row):
+    list_path = WEB_DATA / f"votes-{congress}-senate-{session}.json"
+    # Past roll calls are immutable: only fetch rolls that are new, whose menu
+    # row changed since the last list we wrote, or that are missing from the store.
+    last = {r["rollcall"]: r for r in load_json(list_path, [])}
+    prev = {} if full else last
+    todo = [
+        row for row in rows
+        if prev.get(row["rollcall"]) != row
+        or not store.has_vote(db, f"{congress}-senate-{session}-{row['rollcall']}")
+    ]
+    lis_map = store.lis_index(db)
+    terms = store.TermIndex(store.load_terms(db))
+    # Fetch per-vote detail (concurrently, within the engine's limits)
+    async def work(row):
         try:
-            x = fetch_senate_roll(congress, session, row["rollcall"])
-            data = normalize_senate_roll(x, congress, session, row["rollcall"])
-            save_json(WEB_DATA / f"vote-{congress}-senate-{session}-{row['rollcall']}.json", data)
+            content = await fetch_senate_roll(engine, congress, session, row["rollcall"])
+            data = normalize_senate_roll(content, congress, session, row["rollcall"], lis_map, terms)
+            store.save_vote(db, data)
             return True
         except Exception:
             return False
-    with futures.ThreadPoolExecutor(max_workers=8) as ex:
-        list(ex.map(work, rows))
+    fetched = await asyncio.gather(*(work(row) for row in todo))
+    # Save the list only now, keeping the last listed row of any roll whose
+    # fetch failed: a changed row then still differs next run and is refetched
+    # (a new roll is retried anyway, as it is missing from the store).
+    failed = {row["rollcall"] for row, ok in zip(todo, fetched) if not ok}
+    save_json(list_path, [last.get(r["rollcall"], r) if r["rollcall"] in failed else r for r in rows])
+    # fetch_members may have loaded new LIS ids or terms while we fetched (the pipeline runs both at once)
+    store.resolve_senators(db, store.TermIndex(store.load_terms(db)), f"{congress}-senate-{session}-")
+    finish_session(db, congress, "senate", session)
     return {"congress": congress, "chamber": "senate", "session": session, "count": len(rows)}
 
-def collect_house(congress: int, session: int, max_probe=1200, stop_gap=30):
-    # Probe roll numbers until a streak of 404s suggests the end.
-    found = []
-    misses = 0
-    for roll in range(1, max_probe+1):
+async def collect_house(engine, db, congress: int, session: int, max_probe=1200, stop_gap=30,
+                        full=False):
+    # Probe roll numbers in concurrent windows until a streak of 404s suggests the end.
+    # Roll calls are final once published, so unless `full` is set we resume
+    # from the high-water mark of the previous run and merge into its list.
+    key = f"{congress}-house-{session}"
+    list_path = WEB_DATA / f"votes-{key}.json"
+    existing = {}
+    start = 1
+    if not full:
+        hwm = load_json(SYNC_STATE, {}).get(key, 0)
+        rows = {r["rollcall"]: r for r in load_json(list_path, [])}
+        # only trust the mark if the list and the store both still cover it
+        if hwm and hwm in rows and store.has_vote(db, f"{key}-{hwm}"):
+            existing = rows
+            start = hwm + 1
+
+    terms = store.TermIndex(store.load_terms(db))
+    MISS, SKIP = "miss", "skip"
+    async def probe(roll):
         try:
-            root, url = fetch_house_roll(congress, session, roll)
-            if root is None:
+            content, url = await fetch_house_roll(engine, congress, session, roll)
+        except Exception:
+            return SKIP  # errors after the engine's retries; only a 404 means "no such roll"
+        if content is None:
+            return MISS
+        try:
+            data = normalize_house_roll(content, congress, session, roll, url, terms)
+        except Exception:
+            return SKIP  # bad parse, continue
+        store.save_vote(db, data)
+        return {
+            "congress": congress,
+            "chamber": "house",
+            "session": session,
+            "rollcall": roll,
+            "date": data["date"],
+            "result": data["result"],
+            "question": data["question"],
+            "bill_number": data["bill_number"],
+            "title": data["title"],
+        }
+
+    # A window is one stop gap wide, so at most one window is wasted past the end.
+    found, failed = [], []
+    misses = 0
+    done = False
+    roll = start
+    while roll <= max_probe and not done:
+        batch = range(roll, min(roll + stop_gap, max_probe + 1))
+        for r, row in zip(batch, await asyncio.gather(*(probe(r) for r in batch))):
+            if row is MISS:
                 misses += 1
-                if misses >= stop_gap and len(found) > 0:
+                if misses >= stop_gap:
+                    done = True
                     break
-                continue
-            misses = 0
-            data = normalize_house_roll(root, congress, session, roll, url)
-            found.append({
-                "congress": congress,
-                "chamber": "house",
-                "session": session,
-                "rollcall": roll,
-                "date": data["date"],
-                "result": data["result"],
-                "question": data["question"],
-                "bill_number": data["bill_number"],
-                "title": data["title"],
-            })
-            save_json(WEB_DATA / f"vote-{congress}-house-{session}-{roll}.json", data)
-            # be kind to servers
-            if roll % 20 == 0:
-                time.sleep(0.5)
-        except requests.HTTPError as e:
-            # treat like miss
-            misses += 1
-            if misses >= stop_gap and len(found) > 0:
-                break
-        except Exception:
-            # skip bad parse, continue
-            continue
-    found.sort(key=lambda x: x["rollcall"])
-    save_json(WEB_DATA / f"votes-{congress}-house-{session}.json", found)
-    return {"congress": congress, "chamber": "house", "session": session, "count": len(found)}
+            elif row is SKIP:
+                failed.append(r)
+            else:
+                misses = 0
+                found.append(row)
+        roll = batch.stop
+
+    existing.update((r["rollcall"], r) for r in found)
+    rows = sorted(existing.values(), key=lambda x: x["rollcall"])
+    save_json(list_path, rows)
+    # The mark only moves past rolls that are stored: a roll that failed this
+    # run holds it just below, so the next run probes it (and everything after) again.
+    covered = [r["rollcall"] for r in rows if not failed or r["rollcall"] < min(failed)]
+    if covered or failed:
+        # Re-read and write with no await in between: concurrent backfill
+        # targets update their own marks in the same file.
+        state = load_json(SYNC_STATE, {})
+        if covered:
+            state[key] = covered[-1]
+        else:
+            state.pop(key, None)
+        save_json(SYNC_STATE, state)
+    finish_session(db, congress, "house", session)
+    return {"congress": congress, "chamber": "house", "session": session, "count": len(rows)}
+
+# ---------------------------
+# Columnar export
+# ---------------------------
+# int8 codes; yea/nay are +1/-1, so once every other cell is masked to 0
+# (|code| != 1) agreement between two members is the product of their rows.
+# Present/not voting/other must be masked first: their raw products mean nothing.
+VOTE_CODES = {"Yea": 1, "Aye": 1, "Guilty": 1, "Nay": -1, "No": -1, "Not Guilty": -1,
+              "Present": 2, "Not Voting": 3}
+MATRIX_CODES = {0: "no record", 1: "yea", -1: "nay", 2: "present", 3: "not voting", 4: "other"}
+
+def export_matrix(db, congress: int, chamber: str, session: int):
+    """
+    Write the session as a dense members x roll calls int8 matrix:
+    matrix-{key}.bin holds the raw row-major codes and matrix-{key}.json the
+    member index, roll index and code legend.
+    """
+    key = f"{congress}-{chamber}-{session}"
+    rolls, votes = [], []
+    for v in store.session_votes(db, congress, chamber, session):
+        rolls.append(v["rollcall"])
+        votes.append(v.get("members", []))
+    members = {}
+    for ms in votes:
+        for m in ms:
+            mid = store.member_key(m)
+            if mid and mid not in members:
+                members[mid] = {k: m.get(k, "") for k in
+                                ("last_name", "first_name", "party", "state", "district")}
+    ids = sorted(members)
+    pos = {mid: i for i, mid in enumerate(ids)}
+    width = len(rolls)
+    cells = array("b", bytes(len(ids) * width))
+    for j, ms in enumerate(votes):
+        for m in ms:
+            mid = store.member_key(m)
+            if mid:
+                cells[pos[mid] * width + j] = VOTE_CODES.get(m.get("vote"), 4)
+    path = WEB_DATA / f"matrix-{key}.bin"
+    jsonio.write_if_changed(path, cells.tobytes())
+    save_json(WEB_DATA / f"matrix-{key}.json", {
+        "congress": congress,
+        "chamber": chamber,
+        "session": session,
+        "data": path.name,
+        "dtype": "int8",
+        "shape": [len(ids), width],
+        "order": "row-major (members x roll calls)",
+        "codes": {str(k): v for k, v in MATRIX_CODES.items()},
+        "positions": "only -1/1 are positions; set other cells to 0 before taking products",
+        "rolls": rolls,
+        "members": [dict(id=mid, **members[mid]) for mid in ids],
+    })
+
+def finish_session(db, congress: int, chamber: str, session: int):
+    # Per-session exports from the store
+    export_files(db, congress, chamber, session)
+    export_matrix(db, congress, chamber, session)
+    if VOTE_LAYOUT != "files":
+        write_pack(db, congress, chamber, session)
+
+async def collect(engine, db, congress: int, chamber: str, session: int, full=False):
+    if chamber == "senate":
+        return await collect_senate(engine, db, congress, session, full=full)
+    return await collect_house(engine, db, congress, session, full=full)
 
 def build_index(entries):
-    save_json(WEB_DATA / "votes-index.json", {
-        "generated_at": datetime.now(tz.tzlocal()).isoformat(),
-        "datasets": entries
+    # Merge into the existing index so runs over different targets accumulate.
+    path = WEB_DATA / "votes-index.json"
+    prev = load_json(path, {})
+    datasets = {
+        (d["congress"], d["chamber"], d["session"]): d
+        for d in prev.get("datasets", [])
+    }
+    datasets.update(((e["congress"], e["chamber"], e["session"]), e) for e in entries)
+    datasets = sorted(datasets.values(), key=lambda d: (d["congress"], d["chamber"], d["session"]))
+    # keep the timestamp (and so the file's bytes) while the datasets are unchanged
+    generated_at = prev.get("generated_at") if prev.get("datasets") == datasets else None
+    save_json(path, {
+        "generated_at": generated_at or datetime.now(tz.tzlocal()).isoformat(),
+        "datasets": datasets,
     })
 
+async def backfill(targets, workers=4, full=False):
+    """
+    Collect many (congress, chamber, session) targets on one fetch engine,
+    `workers` targets at a time. Finished targets are checkpointed, so
+    re-running an interrupted backfill over the same targets resumes where it stopped.
+    """
+    targets = [list(t) for t in targets]
+    ck = load_json(CHECKPOINT, {})
+    done = set(ck.get("done", [])) if ck.get("targets") == targets else set()
+    slots = asyncio.Semaphore(workers)
+
+    async def work(engine, db, target):
+        key = "{}-{}-{}".format(*target)
+        if key in done:
+            return None
+        async with slots:
+            try:
+                entry = await collect(engine, db, *target, full=full)
+            except Exception as e:
+                # leave it out of the checkpoint so the next run retries it
+                print(f"WARN: {key} failed ({e})")
+                return None
+        done.add(key)
+        save_json(CHECKPOINT, {"targets": targets, "done": sorted(done)})
+        build_index([entry])
+        print(f"{key}: {entry['count']} roll calls")
+        return entry
+
+    db = store.connect()
+    async with FetchEngine() as engine:
+        entries = await asyncio.gather(*(work(engine, db, t) for t in targets))
+    db.close()
+    if len(done) == len(targets):
+        CHECKPOINT.unlink(missing_ok=True)
+    return [e for e in entries if e]
+
+async def collect_targets(targets, full=False):
+    db = store.connect()
+    async with FetchEngine() as engine:
+        entries = [await collect(engine, db, *t, full=full) for t in targets]
+    db.close()
+    return entries
+
+def parse_range(s: str):
+    lo, _, hi = s.partition("-")
+    return range(int(lo), int(hi or lo) + 1)
+
 def main():
+    global VOTE_LAYOUT
+    ap = argparse.ArgumentParser(description="Fetch roll-call votes into web/data.")
+    ap.add_argument("--full", action="store_true",
+                    help="refetch every roll call instead of only new or changed ones")
+    ap.add_argument("--congress", metavar="FIRST[-LAST]",
+                    help="backfill a congress or range of congresses, e.g. 101-118")
+    ap.add_argument("--sessions", default="1-2", metavar="FIRST[-LAST]",
+                    help="sessions to backfill (default: 1-2)")
+    ap.add_argument("--chambers", default="senate,house",
+                    help="comma-separated chambers to backfill (default: senate,house)")
+    ap.add_argument("--workers", type=int, default=4,
+                    help="targets collected concurrently during a backfill (default: 4)")
+    ap.add_argument("--layout", choices=("files", "pack", "both"), default=VOTE_LAYOUT,
+                    help="per-roll files, per-session packs, or both (default: $CRETO_VOTE_LAYOUT or files)")
+    args = ap.parse_args()
+    VOTE_LAYOUT = args.layout
+    prune_http_cache()
+    if args.congress:
+        targets = [
+            (congress, chamber, session)
+            for congress in parse_range(args.congress)
+            for session in parse_range(args.sessions)
+            for chamber in args.chambers.split(",")
+        ]
+        entries = asyncio.run(backfill(targets, workers=args.workers, full=args.full))
+        print(f"Done: {len(entries)} of {len(targets)} targets collected this run")
+        return
     # Target the current Congress/session first; expand as you like.
     targets = [
         (119, "house", 1),
         (119, "senate", 1),
     ]
-    entries = []
-    for congress, chamber, session in targets:
-        if chamber == "senate":
-            entries.append(collect_senate(congress, session))
-        else:
-            entries.append(collect_house(congress, session))
+    entries = asyncio.run(collect_targets(targets, full=args.full))
     build_index(entries)
     print("Done:", entries)
 
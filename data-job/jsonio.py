@@ -0,0 +1,44 @@
+# data-job/jsonio.py
+"""
+JSON encoding shared by the data jobs.
+- Uses orjson when it is installed, the stdlib json module otherwise
+- Compact output only; the site's JSON is read by code, not people
+- write_if_changed() leaves a file alone when its bytes would not change, so
+  mtimes (and the pipeline's fingerprints) only move on real changes
+"""
+import json
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(data, sort_keys=False) -> bytes:
+    """Serialize `data` to compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(data, option=option)
+    text = json.dumps(data, ensure_ascii=False, separators=(",", ":"), sort_keys=sort_keys)
+    return text.encode("utf-8")
+
+
+def write_if_changed(path: Path, body: bytes):
+    """Atomically write `body` to `path` unless it already holds those bytes; returns True if written."""
+    if path.exists() and path.stat().st_size == len(body) and path.read_bytes() == body:
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_bytes(body)
+    tmp.replace(path)
+    return True
+
+
+def loads(data):
+    """Parse JSON from bytes or str."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# data-job/pipeline.py
+"""
+Run the data jobs as a small DAG, in parallel where the edges allow:
+
+    fetch_members --+
+                    +--> build_api --> compress
+    fetch_votes ----+
+
+- The fetch stages always run (each is incremental on its own)
+- fetch_votes waits for fetch_members only while the store has no legislators
+  yet. Otherwise it may read the LIS and term tables before this run's member
+  update lands: senators are joined by LIS id whenever the store is read (so
+  build_api always sees the update), fetch_members resolves stored senators by
+  LIS id or seat and name after loading, and fetch_votes repeats that for each
+  session before exporting it
+- build_api and compress are skipped when the fingerprint of their inputs
+  matches the one recorded after their last successful run
+"""
+import sys
+import argparse
+import hashlib
+import subprocess
+import concurrent.futures as futures
+from pathlib import Path
+
+import jsonio
+import store
+import compress
+
+HERE = Path(__file__).resolve().parent
+ROOT = HERE.parent
+WEB = ROOT / "web"
+# Input fingerprints of the last successful run of each stage
+STATE = store.CACHE_DIR / "pipeline.json"
+
+
+# ---------- fingerprints ----------
+def file_digest(p: Path):
+    return hashlib.sha1(p.read_bytes()).hexdigest() if p.exists() else None
+
+
+def code_digest(*scripts):
+    """A stage's script together with the sibling modules it imports."""
+    return {name: file_digest(HERE / name) for name in scripts}
+
+
+def store_digest():
+    """Legislators by content; votes by count and last rowid (save_vote always rewrites the row)."""
+    h = hashlib.sha1()
+    db = store.connect()
+    try:
+        for row in db.execute("SELECT bioguide, current, data FROM members ORDER BY bioguide"):
+            h.update(repr(row).encode("utf-8"))
+        h.update(repr(db.execute("SELECT count(*), max(rowid) FROM votes").fetchone()).encode("utf-8"))
+    finally:
+        db.close()
+    return h.hexdigest()
+
+
+def build_api_inputs():
+    return {
+        "code": code_digest("build_api.py", "store.py", "jsonio.py"),
+        "members": file_digest(WEB / "members-current.json"),
+        "promises": file_digest(WEB / "promises.json"),
+        "store": store_digest(),
+    }
+
+
+def compress_inputs():
+    # size + mtime is enough: the fetch jobs and build_api leave files whose
+    # bytes are unchanged untouched (and the workflow caches them with their mtimes)
+    h = hashlib.sha1()
+    for p in compress.generated_json():
+        if p.exists():
+            st = p.stat()
+            h.update(f"{p.relative_to(WEB)}\0{st.st_size}\0{st.st_mtime_ns}\n".encode("utf-8"))
+    return {"code": code_digest("compress.py", "jsonio.py"), "min_size": compress.MIN_SIZE,
+            "files": h.hexdigest()}
+
+
+def store_has_members():
+    db = store.connect()
+    try:
+        return db.execute("SELECT 1 FROM members LIMIT 1").fetchone() is not None
+    finally:
+        db.close()
+
+
+# ---------- stages ----------
+def stages(layout=None):
+    """name -> (command, needs, inputs fingerprint or None, output that must exist to skip)."""
+    votes_cmd = ["fetch_votes.py"] + (["--layout", layout] if layout else [])
+    return {
+        "fetch_members": (["fetch_members.py"], [], None, None),
+        "fetch_votes": (votes_cmd, [] if store_has_members() else ["fetch_members"], None, None),
+        "build_api": (["build_api.py"], ["fetch_members", "fetch_votes"], build_api_inputs,
+                      WEB / "api" / "states" / "index.json"),
+        "compress": (["compress.py"], ["build_api"], compress_inputs, compress.MANIFEST),
+    }
+
+
+def run_stage(name, cmd):
+    """Run one job script, prefixing its output lines with the stage name; returns the exit code."""
+    proc = subprocess.Popen([sys.executable, str(HERE / cmd[0]), *cmd[1:]], cwd=ROOT,
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    for line in proc.stdout:
+        print(f"[{name}] {line}", end="", flush=True)
+    return proc.wait()
+
+
+def run(layout=None, force=False):
+    dag = stages(layout)
+    state = jsonio.loads(STATE.read_bytes()) if STATE.exists() else {}
+    done, failed, running = set(), set(), {}
+
+    with futures.ThreadPoolExecutor(max_workers=len(dag)) as ex:
+        while len(done) + len(failed) < len(dag):
+            for name, (cmd, needs, inputs, output) in dag.items():
+                if name in done or name in failed or name in running:
+                    continue
+                if any(n in failed for n in needs):
+                    print(f"[{name}] skipped: {', '.join(n for n in needs if n in failed)} failed")
+                    failed.add(name)
+                    continue
+                if not all(n in done for n in needs):
+                    continue
+                fp = inputs() if inputs else None
+                if fp is not None and not force and state.get(name) == fp and output.exists():
+                    print(f"[{name}] inputs unchanged; skipped")
+                    done.add(name)
+                    continue
+                running[name] = (ex.submit(run_stage, name, cmd), fp)
+            if not running:
+                continue
+            finished, _ = futures.wait([f for f, _ in running.values()],
+                                       return_when=futures.FIRST_COMPLETED)
+            for name, (fut, fp) in list(running.items()):
+                if fut not in finished:
+                    continue
+                del running[name]
+                if fut.result() == 0:
+                    done.add(name)
+                    if fp is not None:
+                        state[name] = fp
+                else:
+                    print(f"[{name}] failed with exit code {fut.result()}")
+                    failed.add(name)
+
+    STATE.parent.mkdir(parents=True, exist_ok=True)
+    STATE.write_bytes(jsonio.dumps(state))
+    return not failed
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Run the data jobs, skipping stages whose inputs are unchanged.")
+    ap.add_argument("--layout", choices=["files", "pack", "both"],
+                    help="vote export layout passed to fetch_votes.py")
+    ap.add_argument("--force", action="store_true",
+                    help="run every stage even if its input fingerprint is unchanged")
+    args = ap.parse_args()
+    if not run(args.layout, args.force):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+# data-job/ratelimit.py
+"""
+Adaptive per-host request limiter shared by the fetchers, from threads
+(fetch_members) or asyncio tasks (fetch_votes).
+- AIMD concurrency: one more slot per `limit` successes, halved on 429/503;
+  callers waiting for a slot are woken by release(), not by polling
+- Token-bucket pacing at the host's politeness rate
+- Retry-After pauses every request to the host until it has passed
+- A low X-RateLimit-Remaining slows pacing so the rest of the quota lasts the window
+"""
+import time
+import random
+import asyncio
+import threading
+import email.utils
+from collections import deque
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+THROTTLE_STATUSES = (429, 503)
+
+
+def header(headers, name):
+    if not headers:
+        return None
+    value = headers.get(name)
+    return value.strip() if isinstance(value, str) else value
+
+
+def retry_after(headers):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None."""
+    value = header(headers, "Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def retry_delay(attempt: int, headers=None, base=1.0, cap=60.0):
+    """Back-off before retry `attempt` (1-based): Retry-After if given, else jittered exponential."""
+    wait = retry_after(headers)
+    if wait is not None:
+        return min(wait, cap)
+    return min(cap, base * 2 ** (attempt - 1)) * (0.5 + random.random() / 2)
+
+
+class HostLimiter:
+    """
+    Concurrency and pacing budget for one host.
+    acquire()/acquire_async() take a slot; release(status, headers) returns it
+    and feeds the response back into the limits.
+    """
+    def __init__(self, rate=None, max_concurrency=8, min_concurrency=1, window=3600, reserve=0.1):
+        self.rate = rate                  # requests/second, None for unpaced
+        self.max_concurrency = max(min_concurrency, max_concurrency)
+        self.min_concurrency = min_concurrency
+        self.limit = float(max(min_concurrency, self.max_concurrency // 4))  # slow start
+        self.window = window              # seconds an X-RateLimit quota covers
+        self.reserve = reserve            # slow down below this share of the quota
+        self.quota_rate = None
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.tokens = max(1.0, rate or 1.0)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        self.waiters = deque()            # threading.Event or (loop, future) per blocked caller
+
+    def current_rate(self):
+        rates = [r for r in (self.rate, self.quota_rate) if r]
+        return min(rates) if rates else None
+
+    def _try_take(self):
+        """
+        Take a slot (and a token) and return 0, or return how long to wait first:
+        None when every slot is taken (wait for release() to wake the caller).
+        """
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.in_flight >= int(self.limit):
+            return None
+        rate = self.current_rate()
+        if rate:
+            burst = max(1.0, min(rate, self.limit))
+            self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+            self.updated = now
+            if self.tokens < 1:
+                return (1 - self.tokens) / rate
+            self.tokens -= 1
+        self.in_flight += 1
+        return 0
+
+    def _wake(self):
+        # lock held: wake as many queued callers as there are free slots
+        free = int(self.limit) - self.in_flight
+        while free > 0 and self.waiters:
+            waiter = self.waiters.popleft()
+            if isinstance(waiter, threading.Event):
+                waiter.set()
+            else:
+                loop, fut = waiter
+                if fut.done():
+                    continue  # cancelled while queued
+                loop.call_soon_threadsafe(_resolve, fut)
+            free -= 1
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                wait = self._try_take()
+                if wait is None:
+                    woken = threading.Event()
+                    self.waiters.append(woken)
+            if wait == 0:
+                return
+            if wait is None:
+                woken.wait()
+            else:
+                time.sleep(wait)
+
+    async def acquire_async(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            with self.lock:
+                wait = self._try_take()
+                if wait is None:
+                    woken = loop.create_future()
+                    self.waiters.append((loop, woken))
+            if wait == 0:
+                return
+            if wait is None:
+                try:
+                    await woken
+                except asyncio.CancelledError:
+                    with self.lock:
+                        self._wake()  # pass on a wake-up that may have been meant for us
+                    raise
+            else:
+                await asyncio.sleep(wait)
+
+    def release(self, status=None, headers=None):
+        """Return a slot; `status` is None when the request failed without a response."""
+        with self.lock:
+            self.in_flight -= 1
+            if status in THROTTLE_STATUSES:
+                self.limit = max(self.min_concurrency, self.limit / 2)
+                wait = retry_after(headers)
+                if wait:
+                    self.paused_until = max(self.paused_until, time.monotonic() + wait)
+            elif status is not None and status < 400:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            self._wake()
+
+            remaining = header(headers, "X-RateLimit-Remaining")
+            quota = header(headers, "X-RateLimit-Limit")
+            if remaining is not None and quota is not None:
+                try:
+                    remaining, quota = int(remaining), int(quota)
+                except ValueError:
+                    return
+                if remaining < quota * self.reserve:
+                    self.quota_rate = max(remaining, 1) / self.window
+                else:
+                    self.quota_rate = None
+
+
+def _resolve(fut):
+    if not fut.done():
+        fut.set_result(None)
+
+
+_hosts = {}
+_hosts_lock = threading.Lock()
+
+
+def for_host(host: str, **kwargs):
+    """The process-wide HostLimiter for `host`, created with `kwargs` on first use."""
+    with _hosts_lock:
+        if host not in _hosts:
+            _hosts[host] = HostLimiter(**kwargs)
+        return _hosts[host]
@@ -0,0 +1,286 @@
+# data-job/store.py
+"""
+SQLite store shared by the data jobs: the canonical copy of legislators,
+their terms, and every normalized roll call. The static JSON under web/
+is exported from it.
+"""
+import sqlite3
+from bisect import bisect_right
+from collections import defaultdict
+from pathlib import Path
+
+import jsonio
+
+ROOT = Path(__file__).resolve().parents[1]
+# Local state of the data jobs: not deployed, persisted between runs by the workflow cache
+CACHE_DIR = ROOT / ".cache"
+DB_PATH = CACHE_DIR / "creto.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS members (
+    bioguide TEXT PRIMARY KEY,
+    lis      TEXT,
+    state    TEXT,
+    chamber  TEXT,
+    current  INTEGER NOT NULL DEFAULT 0,  -- in this run's members-current.json
+    data     TEXT NOT NULL                -- the members-current.json record
+);
+CREATE INDEX IF NOT EXISTS members_lis ON members(lis);
+CREATE INDEX IF NOT EXISTS members_state ON members(state, chamber);
+
+CREATE TABLE IF NOT EXISTS terms (
+    bioguide TEXT NOT NULL,
+    type     TEXT,     -- "rep" or "sen"
+    state    TEXT,
+    district INTEGER,
+    class    INTEGER,
+    party    TEXT,
+    start    TEXT,     -- ISO dates
+    end      TEXT
+);
+CREATE INDEX IF NOT EXISTS terms_bioguide ON terms(bioguide);
+CREATE INDEX IF NOT EXISTS terms_seat ON terms(state, type, start);
+
+CREATE TABLE IF NOT EXISTS votes (
+    key         TEXT PRIMARY KEY,   -- {congress}-{chamber}-{session}-{roll}
+    congress    INTEGER NOT NULL,
+    chamber     TEXT NOT NULL,
+    session     INTEGER NOT NULL,
+    rollcall    INTEGER NOT NULL,
+    date        TEXT,
+    result      TEXT,
+    question    TEXT,
+    bill_number TEXT,
+    title       TEXT,
+    data        TEXT NOT NULL       -- the full normalized vote document
+);
+CREATE INDEX IF NOT EXISTS votes_session ON votes(congress, chamber, session, rollcall);
+
+CREATE TABLE IF NOT EXISTS member_votes (
+    vote_key  TEXT NOT NULL REFERENCES votes(key),
+    member_id TEXT NOT NULL,        -- bioguide, or lis:{id} when unresolved
+    bioguide  TEXT,
+    vote      TEXT,
+    PRIMARY KEY (vote_key, member_id)
+);
+CREATE INDEX IF NOT EXISTS member_votes_bioguide ON member_votes(bioguide);
+"""
+
+
+def connect(path: Path = None):
+    path = path or DB_PATH
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=60)
+    # WAL lets the member and vote jobs write while build_api reads
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+# ---------- members ----------
+def save_members(conn, legislators, current_ids, terms):
+    """
+    Insert or replace `legislators` (flagging those in `current_ids`) and their
+    terms. Legislators stored by an earlier run but not loaded now are kept
+    (no longer current), so votes attributed to them stay attributed.
+    """
+    with conn:
+        conn.execute("UPDATE members SET current = 0")
+        conn.executemany(
+            "INSERT OR REPLACE INTO members (bioguide, lis, state, chamber, current, data) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (m.get("bioguide"), m.get("lis"), m.get("state"), m.get("chamber"),
+                 int(m.get("bioguide") in current_ids), jsonio.dumps(m).decode("utf-8"))
+                for m in legislators
+            ],
+        )
+        conn.executemany("DELETE FROM terms WHERE bioguide = ?",
+                         [(m.get("bioguide"),) for m in legislators])
+        conn.executemany(
+            "INSERT INTO terms (bioguide, type, state, district, class, party, start, end) "
+            "VALUES (:bioguide, :type, :state, :district, :class, :party, :start, :end)",
+            terms,
+        )
+
+
+def load_members(conn):
+    """Current members, in the order they were saved."""
+    return [jsonio.loads(d) for (d,) in
+            conn.execute("SELECT data FROM members WHERE current = 1 ORDER BY rowid")]
+
+
+def lis_index(conn):
+    """Senate LIS member id -> bioguide id over every stored legislator."""
+    return dict(conn.execute(
+        "SELECT lis, bioguide FROM members WHERE lis IS NOT NULL AND bioguide IS NOT NULL"))
+
+
+def load_terms(conn):
+    """Every stored term, with the legislator's last name for matching roll-call names."""
+    cur = conn.execute(
+        "SELECT t.bioguide, t.type, t.state, t.district, t.class, t.party, t.start, t.end, "
+        "json_extract(m.data, '$.last') AS last "
+        "FROM terms t LEFT JOIN members m ON m.bioguide = t.bioguide"
+    )
+    cols = [c[0] for c in cur.description]
+    return [dict(zip(cols, row)) for row in cur]
+
+
+def seat_of(term):
+    """(state, "sen", class) or (state, "rep", district): the seat a term is served in."""
+    if term.get("type") == "sen":
+        return (term.get("state"), "sen", term.get("class"))
+    return (term.get("state"), "rep", term.get("district"))
+
+
+class TermIndex:
+    """
+    Interval index over terms: who held a seat on a given date.
+    Terms are grouped per seat and sorted by start date, so a lookup is a
+    bisect plus a look at the term just before it (terms can overlap by a
+    day when a seat changes hands).
+    """
+
+    def __init__(self, rows):
+        seats = defaultdict(list)
+        for t in rows:
+            if t.get("start"):
+                seats[seat_of(t)].append((t["start"], t.get("end") or "9999-12-31",
+                                          t["bioguide"], t.get("last")))
+        self.terms = {seat: sorted(ts) for seat, ts in seats.items()}
+        self.starts = {seat: [t[0] for t in ts] for seat, ts in self.terms.items()}
+        self.seats = defaultdict(list)  # (state, chamber) -> seats
+        for seat in self.terms:
+            self.seats[seat[:2]].append(seat)
+
+    def holder(self, seat, date: str):
+        """(bioguide, last name) of whoever held `seat` on ISO `date`, or None."""
+        terms = self.terms.get(seat)
+        if not terms:
+            return None
+        i = bisect_right(self.starts[seat], date)
+        for start, end, bioguide, last in reversed(terms[max(0, i - 2):i]):
+            if date <= end:
+                return bioguide, last
+        return None
+
+    def holders(self, state: str, chamber: str, date: str):
+        """Everyone holding any of the state's seats in `chamber` ("sen"/"rep") on `date`."""
+        found = (self.holder(seat, date) for seat in self.seats.get((state, chamber), []))
+        return [h for h in found if h]
+
+    def match(self, state: str, chamber: str, date: str, last_name: str):
+        """The bioguide of the one seat holder on `date` with this roll-call last name, or None."""
+        last = (last_name or "").split(" (")[0].casefold()
+        hits = [bid for bid, name in self.holders(state, chamber, date)
+                if (name or "").casefold() == last]
+        return hits[0] if len(hits) == 1 else None
+
+
+# ---------- votes ----------
+def member_key(m):
+    # bioguide when known; unresolved senators fall back to their LIS id
+    if m.get("bioguide_id"):
+        return m["bioguide_id"]
+    return f"lis:{m['lis_member_id']}" if m.get("lis_member_id") else ""
+
+
+def save_vote(conn, vote):
+    """Insert or replace one normalized vote and its per-member rows."""
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO votes (key, congress, chamber, session, rollcall, date, "
+            "result, question, bill_number, title, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (vote["key"], vote["congress"], vote["chamber"], vote["session"], vote["rollcall"],
+             vote.get("date"), vote.get("result"), vote.get("question"),
+             vote.get("bill_number"), vote.get("title"), jsonio.dumps(vote).decode("utf-8")),
+        )
+        conn.execute("DELETE FROM member_votes WHERE vote_key = ?", (vote["key"],))
+        conn.executemany(
+            "INSERT OR REPLACE INTO member_votes (vote_key, member_id, bioguide, vote) "
+            "VALUES (?, ?, ?, ?)",
+            [
+                (vote["key"], member_key(m), m.get("bioguide_id") or None, m.get("vote"))
+                for m in vote.get("members", []) if member_key(m)
+            ],
+        )
+
+
+def has_vote(conn, key: str):
+    return conn.execute("SELECT 1 FROM votes WHERE key = ?", (key,)).fetchone() is not None
+
+
+def session_votes(conn, congress: int, chamber: str, session: int):
+    """
+    Yield the normalized vote documents of one session in roll order, with
+    senators saved before their LIS id was known resolved through `members`.
+    """
+    lis = lis_index(conn)
+    for (d,) in conn.execute(
+        "SELECT data FROM votes WHERE congress = ? AND chamber = ? AND session = ? "
+        "ORDER BY rollcall",
+        (congress, chamber, session),
+    ):
+        vote = jsonio.loads(d)
+        for m in vote.get("members", []):
+            if not m.get("bioguide_id") and m.get("lis_member_id") in lis:
+                m["bioguide_id"] = lis[m["lis_member_id"]]
+        yield vote
+
+
+def resolve_senators(conn, terms, prefix=""):
+    """
+    Resolve stored senators saved without a bioguide id, in votes whose key
+    starts with `prefix`: by LIS id when a stored legislator now has it, else
+    by the seat-and-name match (TermIndex `terms`). Resolved ids are saved
+    into the vote rows. Returns the number of votes updated.
+    """
+    lis = lis_index(conn)
+    keys = [k for (k,) in conn.execute(
+        "SELECT DISTINCT vote_key FROM member_votes WHERE bioguide IS NULL "
+        "AND member_id LIKE 'lis:%' AND vote_key LIKE ?", (prefix + "%",))]
+    updated = 0
+    for key in keys:
+        (d,) = conn.execute("SELECT data FROM votes WHERE key = ?", (key,)).fetchone()
+        vote = jsonio.loads(d)
+        changed = False
+        for m in vote.get("members", []):
+            if m.get("bioguide_id"):
+                continue
+            if m.get("lis_member_id") in lis:
+                m["bioguide_id"] = lis[m["lis_member_id"]]
+                changed = True
+                continue
+            if not m.get("state"):
+                continue
+            bid = terms.match(m["state"], "sen", vote.get("date") or "", m.get("last_name"))
+            if bid:
+                m["bioguide_id"] = bid
+                changed = True
+        if changed:
+            save_vote(conn, vote)
+            updated += 1
+    return updated
+
+
+def member_votes(conn):
+    """
+    {bioguide: [vote row, ...]} with each member's newest roll call first.
+    Rows saved under lis:{id} are joined to whichever legislator has that LIS id now.
+    """
+    by_member = {}
+    for bid, vote, *row in conn.execute(
+        "SELECT COALESCE(mv.bioguide, m.bioguide) AS bid, mv.vote, v.key, v.congress, v.chamber, "
+        "v.session, v.rollcall, v.date, v.question, v.result, v.bill_number, v.title "
+        "FROM member_votes mv JOIN votes v ON v.key = mv.vote_key "
+        "LEFT JOIN members m ON mv.bioguide IS NULL AND mv.member_id LIKE 'lis:%' "
+        "AND m.lis = substr(mv.member_id, 5) "
+        "WHERE bid IS NOT NULL "
+        "ORDER BY bid, v.congress DESC, v.session DESC, v.chamber DESC, v.rollcall DESC"
+    ):
+        by_member.setdefault(bid, []).append(dict(zip(
+            ("key", "congress", "chamber", "session", "rollcall", "date",
+             "question", "result", "bill_number", "title"), row), vote=vote))
+    return by_member